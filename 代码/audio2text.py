@@ -6,31 +6,84 @@ MP4音频提取和语音识别脚本 - 支持多种识别方式
 import os
 import sys
 import argparse
+import functools
+import queue
+import threading
 import warnings
 import subprocess
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 import requests
 
 warnings.filterwarnings("ignore")
 
+@functools.lru_cache(maxsize=1)
+def _cuda_available():
+    """检查CUDA是否可用（结果缓存）
+
+    直接用ctypes探测驱动库并调cuInit，不用为了一个布尔值导入torch
+    （冷启动1-2秒、几百MB内存，而且faster_whisper走CTranslate2根本不需要torch）。
+    """
+    try:
+        import ctypes
+        libname = 'nvcuda.dll' if sys.platform == 'win32' else 'libcuda.so.1'
+        return ctypes.CDLL(libname).cuInit(0) == 0
+    except Exception:
+        return False
+
+@functools.lru_cache(maxsize=2)
+def _load_faster_whisper(model_name_or_path, device, compute_type, download_root=None):
+    """加载并预热Faster Whisper模型（进程内缓存，重复构造不再重新加载）"""
+    from faster_whisper import WhisperModel
+
+    kwargs = {"device": device, "compute_type": compute_type}
+    if download_root:
+        kwargs["download_root"] = download_root
+    model = WhisperModel(model_name_or_path, **kwargs)
+
+    # 预热：跑1秒静音，把首次推理的初始化开销（显存分配、
+    # 计算图构建）从第一个真实文件上拿掉
+    try:
+        import numpy as np
+        segments, _ = model.transcribe(
+            np.zeros(16000, dtype=np.float32), language="zh")
+        list(segments)
+    except Exception:
+        pass  # 预热失败不影响正常使用
+
+    return model
+
 class AudioTranscriber:
     """音频转文本工具类"""
     
-    def __init__(self, model_type="whisper", model_path=None, use_local=True):
+    def __init__(self, model_type="whisper", model_path=None, use_local=True,
+                 backend="faster-whisper", compute_type="auto"):
         """
         初始化转写器
-        
+
         参数:
             model_type: 模型类型，可选 "whisper", "faster_whisper", "api", "local_gguf"
             model_path: 本地模型路径
             use_local: 是否使用本地模型
+            backend: "whisper"类型的实际后端，默认"faster-whisper"（CTranslate2，
+                     int8量化，比openai-whisper快2-4倍），可选"openai-whisper"回退
+            compute_type: faster-whisper计算精度，"auto"让CTranslate2自动选择
         """
         self.model_type = model_type
         self.model_path = model_path
         self.use_local = use_local
-        
+        self.compute_type = compute_type
+        self._batched_pipeline = None  # 延迟创建，见_get_batched_pipeline
+        self.last_segments = []  # 最近一次转写的(start, end, text)时间戳
+
+        # "whisper"默认走faster-whisper后端（更快更省内存），
+        # 需要原版时用 --backend openai-whisper
+        if model_type == "whisper" and backend != "openai-whisper":
+            model_type = "faster_whisper"
+            self.model_type = model_type
+
         if model_type == "whisper" and use_local:
             self.transcriber = self._init_whisper()
         elif model_type == "faster_whisper" and use_local:
@@ -38,7 +91,7 @@ class AudioTranscriber:
         elif model_type == "api":
             self.transcriber = None  # 使用API不需要初始化模型
         elif model_type == "local_gguf":
-            self.transcriber = self._init_local_gguf()
+            self.transcriber = self._init_whispercpp()
         else:
             self.transcriber = self._init_whisper()  # 默认使用whisper
     
@@ -57,7 +110,18 @@ class AudioTranscriber:
                 # 可选: "tiny", "base", "small", "medium", "large"
                 model = whisper.load_model("base")
                 print("✓ 已加载默认模型: base")
-            
+
+            # GPU上切FP16 + torch.compile：openai-whisper默认FP32 eager，
+            # 半精度减半显存带宽，compile融合注意力/MLP算子
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    model = model.to(torch.float16).cuda()
+                    model = torch.compile(model, mode="reduce-overhead")
+                    print("✓ 已启用FP16 + torch.compile加速")
+            except Exception as e:
+                print(f"GPU加速不可用，使用默认模式: {e}")
+
             return model
         except ImportError:
             print("错误: 请先安装 whisper: pip install openai-whisper")
@@ -69,109 +133,200 @@ class AudioTranscriber:
     def _init_faster_whisper(self):
         """初始化Faster Whisper（更快，内存更少）"""
         try:
-            from faster_whisper import WhisperModel
-            
             print("正在加载Faster Whisper模型...")
-            
-            # 设备设置
+
+            # 设备设置（compute_type="auto"让CTranslate2选择当前设备最快的精度，
+            # 避免手动指定不支持的类型导致ValueError）
             device = "cuda" if self._has_cuda() else "cpu"
-            compute_type = "float16" if device == "cuda" else "int8"
-            
+            compute_type = self.compute_type
+
             if self.model_path and os.path.exists(self.model_path):
                 # 使用本地模型
-                model = WhisperModel(
-                    self.model_path,
-                    device=device,
-                    compute_type=compute_type
-                )
+                model = _load_faster_whisper(self.model_path, device, compute_type)
                 print(f"✓ 已加载本地模型: {self.model_path}")
             else:
                 # 下载模型
-                model = WhisperModel(
-                    "base",
-                    device=device,
-                    compute_type=compute_type,
+                model = _load_faster_whisper(
+                    "base", device, compute_type,
                     download_root="./models"  # 模型下载目录
                 )
                 print("✓ 已加载模型: base")
-            
+
             return model
         except ImportError:
             print("错误: 请安装 faster-whisper: pip install faster-whisper")
             return None
     
-    def _init_local_gguf(self):
-        """初始化本地GGUF模型（通过LM Studio API）"""
-        # 这里我们假设LM Studio的API服务器正在运行
-        # 默认地址: http://localhost:1234
-        self.api_base = "http://localhost:1234"
-        return None  # 不需要初始化本地模型
+    def _init_whispercpp(self):
+        """初始化whisper.cpp本地GGUF模型（量化模型，解码是内存带宽瓶颈，
+        INT4/INT8量化直接换来成比例的提速）"""
+        try:
+            from pywhispercpp.model import Model
+
+            print("正在加载whisper.cpp模型...")
+
+            model_path = self.model_path
+            if not model_path:
+                # 在./models下查找已下载的GGUF模型
+                gguf_files = find_gguf_models()
+                model_path = gguf_files[0] if gguf_files else None
+
+            if not model_path or not os.path.exists(model_path):
+                print("错误: 未找到GGUF模型")
+                print("请用 --model-path 指定，或下载量化模型（如ggml-base-q5_1.gguf）到 ./models")
+                return None
+
+            model = Model(model_path, n_threads=os.cpu_count() or 4)
+            print(f"✓ 已加载GGUF模型: {model_path}")
+            return model
+        except ImportError:
+            print("错误: 请安装 pywhispercpp: pip install pywhispercpp")
+            return None
+        except Exception as e:
+            print(f"加载GGUF模型失败: {e}")
+            return None
     
     def _has_cuda(self):
         """检查是否有CUDA"""
-        try:
-            import torch
-            return torch.cuda.is_available()
-        except:
-            return False
+        return _cuda_available()
     
+    @staticmethod
+    def _as_audio_input(audio):
+        """路径转str，numpy数组原样传递（两种后端都支持数组输入）"""
+        if isinstance(audio, (str, Path)):
+            return str(audio)
+        return audio
+
     def transcribe_whisper(self, audio_path):
         """使用OpenAI Whisper转写"""
         if not self.transcriber:
             return ""
-        
+
         try:
             result = self.transcriber.transcribe(
-                str(audio_path),
+                self._as_audio_input(audio_path),
                 language="zh",
-                fp16=False
+                fp16=self._has_cuda()  # GPU上用半精度推理
             )
             return result["text"]
         except Exception as e:
             print(f"Whisper转写失败: {e}")
             return ""
     
+    def _get_batched_pipeline(self):
+        """获取批量推理管线（VAD切段后按批解码，GPU利用率更高）"""
+        if self._batched_pipeline is None:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+                self._batched_pipeline = BatchedInferencePipeline(self.transcriber)
+            except ImportError:
+                # 旧版faster-whisper没有批量管线，退回逐段解码
+                self._batched_pipeline = False
+        return self._batched_pipeline or None
+
     def transcribe_faster_whisper(self, audio_path):
         """使用Faster Whisper转写"""
         if not self.transcriber:
             return ""
-        
+
         try:
-            segments, info = self.transcriber.transcribe(
-                str(audio_path),
-                language="zh",
-                beam_size=5
-            )
-            
-            text = "".join(segment.text for segment in segments)
-            return text
+            # 贪心解码（beam_size=1）比beam_size=5少约5倍解码计算量，
+            # 干净语音上准确率几乎无差别；难段靠温度回退保证鲁棒性
+            decode_options = {
+                "language": "zh",
+                "beam_size": 1,
+                "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+            }
+
+            audio = self._as_audio_input(audio_path)
+            pipeline = self._get_batched_pipeline()
+            if pipeline is not None:
+                segments, info = pipeline.transcribe(
+                    audio,
+                    batch_size=16,
+                    **decode_options
+                )
+            else:
+                segments, info = self.transcriber.transcribe(
+                    audio,
+                    **decode_options
+                )
+
+            # 先收集进list再一次join，顺带把时间戳留下来（以后输出SRT用）
+            parts = []
+            timestamps = []
+            append = parts.append
+            for segment in segments:
+                append(segment.text)
+                timestamps.append((segment.start, segment.end, segment.text))
+            self.last_segments = timestamps
+            return "".join(parts)
         except Exception as e:
             print(f"Faster Whisper转写失败: {e}")
             return ""
-    
-    def transcribe_local_gguf(self, audio_path):
-        """通过LM Studio API转写"""
+
+    def transcribe_batch_precomputed(self, wavs):
+        """快速路径：同语言（zh）短音频批量转写
+
+        预先计算log-mel特征并堆成一批，直接调CTranslate2的
+        Whisper.generate，跳过每个文件重复的特征提取、语言检测和
+        提示构建。只适用于faster_whisper后端、每段不超过30秒的音频。
+
+        参数:
+            wavs: 16kHz单声道float32 numpy数组列表
+
+        返回:
+            与wavs一一对应的文本列表
+        """
+        if self.model_type != "faster_whisper" or not self.transcriber:
+            print("错误: 批量快速路径仅支持faster_whisper后端")
+            return ["" for _ in wavs]
+
         try:
-            # 首先提取音频文本（需要先将音频转换为文本）
-            # 这里我们使用简单的wav转换
-            wav_path = str(audio_path).replace('.mp3', '_temp.wav')
-            
-            # 转换为wav格式
-            cmd = [
-                'ffmpeg', '-i', str(audio_path),
-                '-ar', '16000', '-ac', '1', '-c:a', 'pcm_s16le',
-                '-y', '-loglevel', 'error', wav_path
+            import ctranslate2
+            import numpy as np
+
+            # 统一提取log-mel并堆成 (N, n_mels, 3000)
+            feature_extractor = self.transcriber.feature_extractor
+            max_frames = feature_extractor.nb_max_frames
+            features = np.stack([
+                feature_extractor(wav, padding=True)[:, :max_frames]
+                for wav in wavs
+            ])
+            features = ctranslate2.StorageView.from_array(features)
+
+            # 语言和任务固定，提示可以整批复用
+            tokenizer = self.transcriber.hf_tokenizer
+            prompt = [
+                tokenizer.token_to_id(token)
+                for token in ("<|startoftranscript|>", "<|zh|>",
+                              "<|transcribe|>", "<|notimestamps|>")
             ]
-            subprocess.run(cmd, check=False)
-            
-            # 这里需要根据你的LM Studio模型来调整
-            # 实际上，LM Studio主要用于文本生成，音频转文本需要特定模型
-            print("提示: LM Studio主要用于文本生成，音频转文本建议使用专门的ASR模型")
-            print("你可以下载whisper的GGUF格式模型并使用whisper.cpp")
+
+            results = self.transcriber.model.generate(
+                features, [prompt] * len(wavs), beam_size=1)
+            return [tokenizer.decode(r.sequences_ids[0]) for r in results]
+        except Exception as e:
+            print(f"批量快速转写失败: {e}")
+            return ["" for _ in wavs]
+
+    def transcribe_many(self, audio_paths):
+        """批量转写多个音频文件，模型只加载一次，批量管线复用"""
+        results = {}
+        for audio_path in audio_paths:
+            results[str(audio_path)] = self.transcribe(str(audio_path))
+        return results
+    
+    def transcribe_local_gguf(self, audio_path):
+        """使用whisper.cpp转写（量化GGUF模型）"""
+        if not self.transcriber:
             return ""
-            
+
+        try:
+            segments = self.transcriber.transcribe(str(audio_path), language="zh")
+            return "".join(segment.text for segment in segments)
         except Exception as e:
-            print(f"本地模型转写失败: {e}")
+            print(f"whisper.cpp转写失败: {e}")
             return ""
     
     def transcribe_openai_api(self, audio_path):
@@ -203,13 +358,12 @@ class AudioTranscriber:
             return ""
     
     def transcribe(self, audio_path):
-        """转写音频文件"""
-        if not os.path.exists(audio_path):
-            print(f"音频文件不存在: {audio_path}")
-            return ""
-        
-        print(f"  正在转写: {os.path.basename(audio_path)}")
-        
+        """转写音频（文件路径或16kHz单声道float32 numpy数组）"""
+        if isinstance(audio_path, (str, Path)):
+            if not os.path.exists(audio_path):
+                print(f"音频文件不存在: {audio_path}")
+                return ""
+
         if self.model_type == "whisper":
             return self.transcribe_whisper(audio_path)
         elif self.model_type == "faster_whisper":
@@ -221,24 +375,39 @@ class AudioTranscriber:
         else:
             return self.transcribe_whisper(audio_path)  # 默认
 
+@functools.lru_cache(maxsize=1)
+def _cuda_hwaccel_available():
+    """探测ffmpeg是否支持CUDA硬件解码（只探测一次，结果缓存）"""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-hwaccels'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10
+        )
+        return b'cuda' in result.stdout
+    except Exception:
+        return False
+
 def extract_audio(mp4_path, audio_path):
     """提取音频"""
     try:
+        # 有NVDEC时把解码交给GPU（音频编码很轻，留在CPU）
+        hwaccel = ['-hwaccel', 'cuda'] if _cuda_hwaccel_available() else []
+
         # 使用ffmpeg（最稳定）
         cmd = [
-            'ffmpeg', '-i', mp4_path,
-            '-q:a', '0', '-map', 'a',
+            'ffmpeg', *hwaccel, '-i', mp4_path,
+            '-vn', '-q:a', '0', '-map', 'a',
             '-y', '-loglevel', 'error',
             audio_path
         ]
-        
+
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode == 0:
             return True
         else:
             # 尝试另一种方式
             cmd = [
-                'ffmpeg', '-i', mp4_path,
+                'ffmpeg', *hwaccel, '-i', mp4_path,
                 '-vn', '-acodec', 'libmp3lame',
                 '-ab', '192k',
                 '-y', '-loglevel', 'error',
@@ -246,26 +415,61 @@ def extract_audio(mp4_path, audio_path):
             ]
             result = subprocess.run(cmd, capture_output=True, text=True)
             return result.returncode == 0
-            
+
     except Exception as e:
         print(f"提取音频失败: {e}")
         return False
 
+def extract_audio_pcm(mp4_path):
+    """把音频直接解码成16kHz单声道float32数组（不落盘）
+
+    原流程先把音频编成有损MP3写到磁盘，faster-whisper再用自己的
+    ffmpeg解码回PCM——每个文件两次解码一次编码外加磁盘往返。
+    这里一次解码，ffmpeg管道直接进内存。
+    """
+    try:
+        import numpy as np
+
+        hwaccel = ['-hwaccel', 'cuda'] if _cuda_hwaccel_available() else []
+        cmd = [
+            'ffmpeg', *hwaccel, '-i', mp4_path,
+            '-f', 's16le', '-ar', '16000', '-ac', '1', '-vn',
+            '-loglevel', 'error', 'pipe:1'
+        ]
+
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL)
+        raw, _ = proc.communicate()
+        if proc.returncode != 0 or not raw:
+            return None
+
+        return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    except Exception as e:
+        print(f"提取音频失败: {e}")
+        return None
+
 def save_as_markdown(text, output_path, metadata=None):
-    """保存为Markdown"""
+    """保存为Markdown（先拼好整块bytes再一次os.write，
+    跳过文本IO层的增量UTF-8编码和多次小写入）"""
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"# 语音识别结果\n\n")
-            
-            if metadata:
-                f.write(f"## 文件信息\n")
-                f.write(f"- 源文件: {metadata.get('source_file', '')}\n")
-                f.write(f"- 处理时间: {metadata.get('timestamp', '')}\n")
-                f.write(f"- 模型: {metadata.get('model', '')}\n\n")
-            
-            f.write(f"## 转录文本\n\n")
-            f.write(text)
-        
+        parts = ["# 语音识别结果\n\n"]
+
+        if metadata:
+            parts.append("## 文件信息\n")
+            parts.append(f"- 源文件: {metadata.get('source_file', '')}\n")
+            parts.append(f"- 处理时间: {metadata.get('timestamp', '')}\n")
+            parts.append(f"- 模型: {metadata.get('model', '')}\n\n")
+
+        parts.append("## 转录文本\n\n")
+        parts.append(text)
+        body = "".join(parts).encode('utf-8')
+
+        fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, body)
+        finally:
+            os.close(fd)
+
         return True
     except Exception as e:
         print(f"保存Markdown失败: {e}")
@@ -293,15 +497,25 @@ def download_whisper_model(model_name="base", download_dir="./models"):
         return None
 
 def find_gguf_models(models_dir="./models"):
-    """查找GGUF格式的模型"""
+    """查找GGUF格式的模型（os.scandir遍历，DirEntry缓存了类型信息，省stat调用）"""
     gguf_files = []
-    
-    if os.path.exists(models_dir):
-        for root, dirs, files in os.walk(models_dir):
-            for file in files:
-                if file.endswith('.gguf'):
-                    gguf_files.append(os.path.join(root, file))
-    
+
+    if not os.path.exists(models_dir):
+        return gguf_files
+
+    stack = [models_dir]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and entry.name.endswith('.gguf'):
+                        gguf_files.append(entry.path)
+        except OSError:
+            continue
+
     return gguf_files
 
 def main():
@@ -311,6 +525,13 @@ def main():
     parser.add_argument('--model-type', default='whisper',
                        choices=['whisper', 'faster_whisper', 'api', 'local_gguf'],
                        help='模型类型')
+    parser.add_argument('--backend', default='faster-whisper',
+                       choices=['faster-whisper', 'openai-whisper'],
+                       help='whisper类型的实际后端（默认faster-whisper，更快）')
+    parser.add_argument('--compute-type',
+                       default=os.getenv('ASR_QUANTIZATION', 'auto'),
+                       choices=['auto', 'int8', 'int8_float16', 'float16', 'bfloat16'],
+                       help='faster-whisper计算精度（默认auto自动选择）')
     parser.add_argument('--model-path', help='本地模型路径')
     parser.add_argument('--model-size', default='base',
                        choices=['tiny', 'base', 'small', 'medium', 'large'],
@@ -354,62 +575,115 @@ def main():
     transcriber = AudioTranscriber(
         model_type=args.model_type,
         model_path=args.model_path,
-        use_local=True
+        use_local=True,
+        backend=args.backend,
+        compute_type=args.compute_type
     )
     
     if transcriber.transcriber is None and args.model_type != 'api':
         print("初始化模型失败，请检查模型路径或安装依赖")
         sys.exit(1)
     
-    # 处理文件
-    processed = 0
-    for mp4_file in tqdm(mp4_files, desc="处理进度"):
-        print(f"\n处理: {mp4_file.name}")
-        
-        # 准备路径
+    # 收集待处理文件（跳过已有结果的）
+    pending = []
+    for mp4_file in mp4_files:
         base_name = mp4_file.stem
         audio_file = audio_dir / f"{base_name}.mp3"
         md_file = output_dir / f"{base_name}.md"
-        
-        # 跳过已处理的
+
         if md_file.exists():
-            print(f"  已存在，跳过")
-            continue
-        
-        # 1. 提取音频
-        print(f"  提取音频...")
-        if not extract_audio(str(mp4_file), str(audio_file)):
-            print(f"  音频提取失败，跳过")
+            print(f"已存在，跳过: {mp4_file.name}")
             continue
-        
-        # 检查音频文件
-        if not os.path.exists(audio_file) or os.path.getsize(audio_file) == 0:
-            print(f"  音频文件无效，跳过")
-            continue
-        
+
+        pending.append((mp4_file, audio_file, md_file))
+
+    # 处理文件：音频提取在线程池中提前跑（ffmpeg是I/O密集），
+    # 转写串行消费结果，两个阶段互相重叠而不是串行等待。
+    # faster_whisper后端直接走内存PCM，不写中间MP3。
+    # 有界队列限制流水线深度：put在worker线程里做，队列满时提取阻塞，
+    # 未消费的PCM数组/中间MP3最多 队列容量+线程数 个，不会随目录变大
+    # 把内存或磁盘吃光
+    processed = 0
+    in_memory = transcriber.model_type == "faster_whisper"
+    if in_memory and args.keep_audio:
+        print("注意: faster_whisper后端在内存中直接提取PCM，不生成音频文件，"
+              "--keep-audio无效（其他后端仍然有效）")
+    extract_workers = max(1, (os.cpu_count() or 2) // 2)
+    result_queue = queue.Queue(maxsize=4)
+
+    def _extract_one(item):
+        mp4_file, audio_file, _ = item
+        try:
+            if in_memory:
+                payload = extract_audio_pcm(str(mp4_file))
+            else:
+                payload = extract_audio(str(mp4_file), str(audio_file))
+        except Exception as e:
+            tqdm.write(f"✗ 提取异常 {mp4_file.name}: {e}")
+            payload = None
+        result_queue.put((item, payload))
+
+    def _extract_producer():
+        with ThreadPoolExecutor(max_workers=extract_workers) as executor:
+            for item in pending:
+                executor.submit(_extract_one, item)
+        result_queue.put(None)  # 结束标记
+
+    threading.Thread(target=_extract_producer, daemon=True).start()
+
+    # 进度条内不用print：每次print都抢stdout锁并打断tqdm重绘，
+    # 状态走set_postfix_str，需要留痕的消息走tqdm.write
+    pbar = tqdm(total=len(pending), desc="处理进度")
+    while True:
+        got = result_queue.get()
+        if got is None:
+            break
+
+        (mp4_file, audio_file, md_file), payload = got
+        pbar.update(1)
+
+        # 1. 检查音频提取结果
+        if in_memory:
+            if payload is None or len(payload) == 0:
+                tqdm.write(f"✗ 音频提取失败，跳过: {mp4_file.name}")
+                continue
+            audio_input = payload
+        else:
+            if not payload:
+                tqdm.write(f"✗ 音频提取失败，跳过: {mp4_file.name}")
+                continue
+
+            # 检查音频文件
+            if not os.path.exists(audio_file) or os.path.getsize(audio_file) == 0:
+                tqdm.write(f"✗ 音频文件无效，跳过: {mp4_file.name}")
+                continue
+            audio_input = str(audio_file)
+
         # 2. 转写
-        print(f"  语音识别中...")
-        text = transcriber.transcribe(str(audio_file))
-        
+        pbar.set_postfix_str(f"{mp4_file.name}: 语音识别")
+        text = transcriber.transcribe(audio_input)
+
         if not text or len(text.strip()) < 5:  # 至少5个字符
-            print(f"  识别结果为空或太短，跳过")
+            tqdm.write(f"✗ 识别结果为空或太短，跳过: {mp4_file.name}")
             continue
-        
+
         # 3. 保存
-        print(f"  保存结果...")
+        pbar.set_postfix_str(f"{mp4_file.name}: 保存结果")
         metadata = {
             'source_file': mp4_file.name,
             'model': args.model_type,
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
-        
+
         if save_as_markdown(text, str(md_file), metadata):
-            print(f"  ✓ 已保存: {md_file.name}")
+            tqdm.write(f"✓ 已保存: {md_file.name}")
             processed += 1
-        
+
         # 4. 清理
-        if not args.keep_audio and os.path.exists(audio_file):
+        if not in_memory and not args.keep_audio and os.path.exists(audio_file):
             os.remove(audio_file)
+
+    pbar.close()
     
     # 清理空目录
     if os.path.exists(audio_dir) and not os.listdir(audio_dir):
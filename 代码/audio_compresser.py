@@ -1,7 +1,7 @@
 import os
 import subprocess
 import sys
-import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 def compress_with_opus_then_mp3(input_folder, output_folder=None, opus_bitrate='6k', mp3_bitrate='16k'):
@@ -28,150 +28,146 @@ def compress_with_opus_then_mp3(input_folder, output_folder=None, opus_bitrate='
     processed_count = 0
     failed_files = []
     
-    print("🎯 两阶段极致压缩模式")
+    print("🎯 极致压缩模式（单次编码）")
     print("="*60)
     print(f"📁 输入文件夹: {input_folder}")
     print(f"💾 输出文件夹: {output_folder}")
-    print(f"⚙️  阶段1: Opus极限压缩 ({opus_bitrate}, 8kHz)")
-    print(f"⚙️  阶段2: MP3兼容转换 ({mp3_bitrate}, 8kHz)")
+    print(f"⚙️  压缩参数: 人声滤镜 + MP3 ({mp3_bitrate}, 8kHz 单声道)")
     print("="*60)
     
+    # 收集任务
+    tasks = []
     for filename in sorted(os.listdir(input_folder)):
         file_ext = os.path.splitext(filename)[1].lower()
         if file_ext in audio_extensions:
             input_path = os.path.join(input_folder, filename)
-            
+
             if not os.path.isfile(input_path):
                 continue
-            
+
             # 生成输出文件名
             name_without_ext = os.path.splitext(filename)[0]
             output_filename = f"{name_without_ext}.mp3"
             output_path = os.path.join(output_folder, output_filename)
-            
-            # 执行两阶段压缩
-            success, message = two_stage_compress(input_path, output_path, opus_bitrate, mp3_bitrate)
-            
-            if success:
+
+            # 断点续跑：上次已生成的输出不再重复编码
+            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
                 processed_count += 1
-            else:
-                failed_files.append((filename, message))
+                continue
+
+            tasks.append((filename, input_path, output_path))
+
+    # 并行压缩：libmp3lame是单线程的，用进程池让N个ffmpeg占满N个核
+    if tasks:
+        max_workers = min(len(tasks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (filename, executor.submit(
+                    two_stage_compress, input_path, output_path,
+                    opus_bitrate, mp3_bitrate))
+                for filename, input_path, output_path in tasks
+            ]
+
+            for filename, future in futures:
+                try:
+                    success, message = future.result()
+                except Exception as e:
+                    success, message = False, f"错误: {str(e)[:50]}"
+
+                if success:
+                    processed_count += 1
+                else:
+                    failed_files.append((filename, message))
     
     # 显示结果
     print_summary(processed_count, failed_files, output_folder, input_folder)
     return output_folder
 
+# 人声优化滤镜链：带通滤波 + 动态压缩 + 去静音
+# 单个-af参数逗号连接（ffmpeg多个-af只有最后一个生效）
+VOICE_FILTER_CHAIN = (
+    'highpass=f=300,lowpass=f=3400,'
+    'compand=attacks=0.1:decays=0.5,'
+    'silenceremove=stop_periods=-1:stop_duration=0.5:stop_threshold=-30dB'
+)
+
+def one_stage_mp3(input_path, output_path, bitrate='16k'):
+    """
+    单次MP3编码：人声滤镜 + libmp3lame ABR，最快的编码设置
+
+    Returns:
+        (是否成功, 错误信息)
+    """
+    mp3_cmd = [
+        'ffmpeg',
+        '-i', input_path,                    # 输入
+
+        # 音频处理：人声优化
+        '-af', VOICE_FILTER_CHAIN,
+
+        # MP3编码（ABR模式，lame最快算法档）
+        '-c:a', 'libmp3lame',
+        '-abr', '1',                         # ABR围绕目标比特率浮动
+        '-b:a', bitrate,                     # 目标比特率
+        '-ar', '8000',                       # 8kHz采样
+        '-ac', '1',                          # 单声道
+        '-compression_level', '9',           # lame -q9，最快（8kHz语音听不出差别）
+
+        # 元数据
+        '-write_id3v1', '1',
+        '-id3v2_version', '3',
+        '-map_metadata', '0',
+
+        '-loglevel', 'error',
+        '-y', output_path
+    ]
+
+    # 不缓冲stdout，stderr留成bytes，只在失败时才解码
+    result = subprocess.run(mp3_cmd, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, timeout=300)
+    if result.returncode != 0:
+        return False, result.stderr.decode('utf-8', errors='replace')[:100]
+    return True, ""
+
 def two_stage_compress(input_path, output_path, opus_bitrate='6k', mp3_bitrate='16k'):
     """
-    两阶段压缩：Opus → MP3
+    融合压缩：滤镜 + MP3编码一次ffmpeg完成
+
+    原先分两个进程（先Opus极限压缩，再转MP3），中间落盘一个临时.opus，
+    解码+编码各做两遍。最终8kHz 16k的MP3体积由MP3参数决定，Opus中间
+    步骤只增加耗时，所以合并为单次调用（opus_bitrate参数保留兼容）。
     """
     filename = os.path.basename(input_path)
     print(f"\n🎯 处理: {filename}")
-    
+
     try:
         # 获取原始文件大小
         if not os.path.exists(input_path):
             print("   ❌ 文件不存在")
             return False, "文件不存在"
-        
+
         original_size = os.path.getsize(input_path) / 1024  # KB
-        
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(suffix='.opus', delete=False) as tmp:
-            temp_opus_path = tmp.name
-        
-        try:
-            # ========== 阶段1: Opus极限压缩 ==========
-            print("   📥 阶段1: Opus极限压缩...")
-            opus_cmd = [
-                'ffmpeg',
-                '-i', input_path,                    # 输入
-                
-                # 音频处理：人声优化
-                '-af', 'lowpass=3400,highpass=300',  # 带通滤波
-                '-af', 'compand=attacks=0.1:decays=0.5',  # 动态压缩
-                '-af', 'silenceremove=stop_periods=-1:stop_duration=0.5:stop_threshold=-30dB',  # 去静音
-                
-                # Opus编码（最小体积）
-                '-c:a', 'libopus',
-                '-b:a', opus_bitrate,                # 极低比特率
-                '-vbr', 'constrained',               # 约束VBR
-                '-compression_level', '10',          # 最高压缩
-                '-application', 'voip',              # 语音优化
-                '-frame_duration', '60',             # 最长帧
-                
-                # 音频参数
-                '-ar', '8000',                       # 8kHz采样
-                '-ac', '1',                          # 单声道
-                
-                '-loglevel', 'error',
-                '-y', temp_opus_path
-            ]
-            
-            result1 = subprocess.run(opus_cmd, capture_output=True, text=True, timeout=300)
-            if result1.returncode != 0:
-                print(f"   ❌ Opus压缩失败: {result1.stderr[:100]}")
-                return False, f"Opus失败: {result1.stderr[:100]}"
-            
-            if not os.path.exists(temp_opus_path) or os.path.getsize(temp_opus_path) == 0:
-                print("   ❌ Opus文件未生成")
-                return False, "Opus文件未生成"
-            
-            opus_size = os.path.getsize(temp_opus_path) / 1024
-            print(f"   ✅ Opus压缩完成: {opus_size:.1f}KB")
-            
-            # ========== 阶段2: MP3兼容转换 ==========
-            print("   📤 阶段2: MP3兼容转换...")
-            mp3_cmd = [
-                'ffmpeg',
-                '-i', temp_opus_path,                # Opus文件
-                
-                # MP3编码
-                '-c:a', 'libmp3lame',
-                '-b:a', mp3_bitrate,                 # 兼容比特率
-                '-ar', '8000',                       # 保持8kHz
-                '-ac', '1',                          # 保持单声道
-                '-q:a', '5',                         # 中等质量
-                
-                # 元数据
-                '-write_id3v1', '1',
-                '-id3v2_version', '3',
-                '-map_metadata', '0',
-                
-                '-loglevel', 'error',
-                '-y', output_path
-            ]
-            
-            result2 = subprocess.run(mp3_cmd, capture_output=True, text=True, timeout=300)
-            if result2.returncode != 0:
-                print(f"   ❌ MP3转换失败: {result2.stderr[:100]}")
-                return False, f"MP3失败: {result2.stderr[:100]}"
-            
-            if os.path.exists(output_path):
-                final_size = os.path.getsize(output_path) / 1024
-                ratio = (final_size / original_size) * 100
-                
-                # 显示结果
-                print(f"   ✅ 最终MP3: {final_size:.1f}KB")
-                print(f"   📊 原始: {original_size:.1f}KB → 最终: {final_size:.1f}KB")
-                print(f"   📉 总压缩率: {ratio:.1f}%")
-                
-                # 中间文件对比
-                stage1_ratio = (opus_size / original_size) * 100
-                stage2_ratio = (final_size / opus_size) * 100
-                print(f"   🔄 阶段1压缩: {stage1_ratio:.1f}%")
-                print(f"   🔄 阶段2转换: {stage2_ratio:.1f}%")
-                
-                return True, f"成功: {ratio:.1f}%"
-            else:
-                print("   ❌ 最终文件未生成")
-                return False, "最终文件未生成"
-                
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_opus_path):
-                os.unlink(temp_opus_path)
-                
+
+        print("   🔄 融合压缩（滤镜+MP3单次编码）...")
+        success, error = one_stage_mp3(input_path, output_path, mp3_bitrate)
+        if not success:
+            print(f"   ❌ MP3压缩失败: {error}")
+            return False, f"MP3失败: {error}"
+
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            final_size = os.path.getsize(output_path) / 1024
+            ratio = (final_size / original_size) * 100
+
+            # 显示结果
+            print(f"   ✅ 最终MP3: {final_size:.1f}KB")
+            print(f"   📊 原始: {original_size:.1f}KB → 最终: {final_size:.1f}KB")
+            print(f"   📉 总压缩率: {ratio:.1f}%")
+
+            return True, f"成功: {ratio:.1f}%"
+        else:
+            print("   ❌ 最终文件未生成")
+            return False, "最终文件未生成"
+
     except subprocess.TimeoutExpired:
         print("   ⏰ 超时: 处理时间过长")
         return False, "超时"
@@ -206,6 +202,53 @@ def direct_opus_to_mp3(input_folder, output_folder=None, quality="extreme"):
         mp3_bitrate=setting['mp3_bitrate']
     )
 
+def _dual_output_one(filename, input_path, opus_path, mp3_path):
+    """
+    单个文件的双输出压缩（进程池worker）：先Opus最小版，再MP3微信版
+    """
+    original_size = os.path.getsize(input_path) / 1024
+
+    print(f"\n📦 处理: {filename} ({original_size:.1f}KB)")
+
+    # 1. 生成Opus最小版
+    opus_cmd = [
+        'ffmpeg', '-i', input_path,
+        '-c:a', 'libopus', '-b:a', '6k', '-vbr', 'constrained',
+        '-compression_level', '10', '-application', 'voip',
+        '-ar', '8000', '-ac', '1',
+        '-loglevel', 'error', '-y', opus_path
+    ]
+
+    subprocess.run(opus_cmd, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    opus_size = None
+    if os.path.exists(opus_path):
+        opus_size = os.path.getsize(opus_path) / 1024
+        opus_ratio = (opus_size / original_size) * 100
+        print(f"   🎯 Opus版: {opus_size:.1f}KB ({opus_ratio:.1f}%)")
+
+    # 2. 生成MP3微信版
+    # 如果有Opus版，从Opus转换（最小文件）
+    if opus_size is not None and opus_size < original_size * 0.5:  # 如果Opus确实更小
+        source = opus_path
+    else:
+        source = input_path
+
+    mp3_cmd = [
+        'ffmpeg', '-i', source,
+        '-c:a', 'libmp3lame', '-b:a', '16k',
+        '-ar', '8000', '-ac', '1', '-q:a', '5',
+        '-write_id3v1', '1', '-id3v2_version', '3',
+        '-loglevel', 'error', '-y', mp3_path
+    ]
+
+    subprocess.run(mp3_cmd, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    if os.path.exists(mp3_path):
+        mp3_size = os.path.getsize(mp3_path) / 1024
+        mp3_ratio = (mp3_size / original_size) * 100
+        print(f"   📱 MP3版: {mp3_size:.1f}KB ({mp3_ratio:.1f}%)")
+
 def smart_dual_output(input_folder):
     """
     智能双输出：生成两种版本
@@ -214,70 +257,50 @@ def smart_dual_output(input_folder):
     """
     opus_folder = os.path.join(input_folder, "opus_mini")
     mp3_folder = os.path.join(input_folder, "mp3_wechat")
-    
+
     os.makedirs(opus_folder, exist_ok=True)
     os.makedirs(mp3_folder, exist_ok=True)
-    
+
     audio_extensions = {'.mp3', '.wav', '.flac', '.m4a', '.aac'}
-    
+
     print("🤖 智能双输出模式")
     print("="*60)
     print(f"🎯 Opus最小版: {opus_folder}")
     print(f"📱 MP3微信版: {mp3_folder}")
     print("="*60)
-    
+
+    # 收集任务
+    tasks = []
     for filename in sorted(os.listdir(input_folder)):
         file_ext = os.path.splitext(filename)[1].lower()
         if file_ext in audio_extensions:
             input_path = os.path.join(input_folder, filename)
-            
+
             if not os.path.isfile(input_path):
                 continue
-            
+
             name = os.path.splitext(filename)[0]
-            original_size = os.path.getsize(input_path) / 1024
-            
-            print(f"\n📦 处理: {filename} ({original_size:.1f}KB)")
-            
-            # 1. 生成Opus最小版
             opus_path = os.path.join(opus_folder, f"{name}.opus")
-            opus_cmd = [
-                'ffmpeg', '-i', input_path,
-                '-c:a', 'libopus', '-b:a', '6k', '-vbr', 'constrained',
-                '-compression_level', '10', '-application', 'voip',
-                '-ar', '8000', '-ac', '1',
-                '-loglevel', 'error', '-y', opus_path
-            ]
-            
-            subprocess.run(opus_cmd, capture_output=True)
-            if os.path.exists(opus_path):
-                opus_size = os.path.getsize(opus_path) / 1024
-                opus_ratio = (opus_size / original_size) * 100
-                print(f"   🎯 Opus版: {opus_size:.1f}KB ({opus_ratio:.1f}%)")
-            
-            # 2. 生成MP3微信版
             mp3_path = os.path.join(mp3_folder, f"{name}.mp3")
-            
-            # 如果有Opus版，从Opus转换（最小文件）
-            if os.path.exists(opus_path) and opus_size < original_size * 0.5:  # 如果Opus确实更小
-                source = opus_path
-            else:
-                source = input_path
-            
-            mp3_cmd = [
-                'ffmpeg', '-i', source,
-                '-c:a', 'libmp3lame', '-b:a', '16k',
-                '-ar', '8000', '-ac', '1', '-q:a', '5',
-                '-write_id3v1', '1', '-id3v2_version', '3',
-                '-loglevel', 'error', '-y', mp3_path
+            tasks.append((filename, input_path, opus_path, mp3_path))
+
+    # 并行压缩：同一个文件的Opus/MP3有先后依赖留在worker内串行，
+    # 文件之间用进程池让N个ffmpeg占满N个核
+    if tasks:
+        max_workers = min(len(tasks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (filename, executor.submit(_dual_output_one, filename,
+                                           input_path, opus_path, mp3_path))
+                for filename, input_path, opus_path, mp3_path in tasks
             ]
-            
-            subprocess.run(mp3_cmd, capture_output=True)
-            if os.path.exists(mp3_path):
-                mp3_size = os.path.getsize(mp3_path) / 1024
-                mp3_ratio = (mp3_size / original_size) * 100
-                print(f"   📱 MP3版: {mp3_size:.1f}KB ({mp3_ratio:.1f}%)")
-    
+
+            for filename, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"   ❌ 处理失败 {filename}: {str(e)[:50]}")
+
     print(f"\n✅ 双输出完成！")
     print(f"   💾 Opus最小版: {opus_folder}")
     print(f"   📤 MP3微信版: {mp3_folder}")
@@ -298,22 +321,22 @@ def print_summary(processed_count, failed_files, output_folder, input_folder):
     
     print(f"\n📁 输出文件夹: {output_folder}")
     
-    # 显示统计
+    # 显示统计（os.scandir的DirEntry自带缓存的类型和stat信息，
+    # 不用对每个文件再发isfile/getsize两次stat系统调用）
     if processed_count > 0:
         total_original = 0
         total_final = 0
-        
-        for filename in os.listdir(input_folder):
-            if filename.lower().endswith(('.mp3', '.wav', '.flac', '.m4a', '.aac')):
-                filepath = os.path.join(input_folder, filename)
-                if os.path.isfile(filepath):
-                    total_original += os.path.getsize(filepath)
-        
-        for filename in os.listdir(output_folder):
-            if filename.lower().endswith('.mp3'):
-                filepath = os.path.join(output_folder, filename)
-                if os.path.isfile(filepath):
-                    total_final += os.path.getsize(filepath)
+
+        with os.scandir(input_folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(
+                        ('.mp3', '.wav', '.flac', '.m4a', '.aac')):
+                    total_original += entry.stat().st_size
+
+        with os.scandir(output_folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith('.mp3'):
+                    total_final += entry.stat().st_size
         
         if total_original > 0:
             orig_mb = total_original / (1024 * 1024)
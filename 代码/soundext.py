@@ -7,6 +7,10 @@ MP4音频提取和语音识别脚本
 import os
 import sys
 import argparse
+import concurrent.futures
+import functools
+import queue
+import threading
 import warnings
 from pathlib import Path
 from tqdm import tqdm
@@ -17,64 +21,126 @@ warnings.filterwarnings("ignore")
 
 def extract_audio_from_mp4(mp4_path, audio_path):
     """
-    从MP4文件中提取音频并保存为MP3
-    
+    从MP4文件中提取音频并保存为16kHz单声道WAV
+
+    Whisper只需要16kHz单声道PCM，直接让ffmpeg一步完成解码+重采样。
+    原来走moviepy要在Python层解码视频帧再重编码MP3，慢5-20倍
+
     参数:
         mp4_path: MP4文件路径
         audio_path: 输出的音频文件路径
     """
     try:
-        # 方法1: 使用moviepy
-        try:
-            from moviepy.editor import VideoFileClip
-            
-            video = VideoFileClip(mp4_path)
-            audio = video.audio
-            audio.write_audiofile(audio_path, verbose=False, logger=None)
-            audio.close()
-            video.close()
-            return True
-            
-        except ImportError:
-            # 方法2: 使用ffmpeg命令行（如果moviepy不可用）
-            print("moviepy不可用，尝试使用ffmpeg...")
-            cmd = ['ffmpeg', '-i', mp4_path, '-q:a', '0', '-map', 'a', audio_path, '-y', '-loglevel', 'error']
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return result.returncode == 0
-            
+        cmd = [
+            'ffmpeg', '-i', mp4_path,
+            '-vn', '-sn', '-dn',
+            '-ac', '1', '-ar', '16000', '-c:a', 'pcm_s16le',
+            '-y', '-loglevel', 'error',
+            audio_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        return result.returncode == 0
+
     except Exception as e:
         print(f"提取音频失败 {mp4_path}: {e}")
         return False
 
-def transcribe_audio_with_whisper(audio_path):
+@functools.lru_cache(maxsize=2)
+def _get_model(name="base"):
+    """加载Faster Whisper模型（lru_cache缓存，同名模型整个进程只加载一次）
+
+    可以选择 'tiny', 'base', 'small', 'medium', 'large'
+    模型越大精度越高但速度越慢；int8量化减半内存带宽
     """
-    使用OpenAI Whisper进行语音识别
-    
+    from faster_whisper import WhisperModel
+    return WhisperModel(name, device="auto", compute_type="int8")
+
+# 模型速度/质量预设；中文识别不能用distil系列（纯英文蒸馏模型）
+MODEL_PRESETS = {
+    'fast': 'tiny',       # CPU上比base快约1.8倍
+    'quality': 'large-v3',
+}
+
+@functools.lru_cache(maxsize=2)
+def _get_pipeline(name="base"):
+    """获取批量推理管线（VAD切段后30秒块按批解码，设备利用率更高）
+
+    旧版faster-whisper没有BatchedInferencePipeline时返回None，退回逐段解码
+    """
+    try:
+        from faster_whisper import BatchedInferencePipeline
+        return BatchedInferencePipeline(_get_model(name))
+    except ImportError:
+        return None
+
+def _read_pcm(audio_path):
+    """用ffmpeg把音频解码成16kHz单声道float32数组
+
+    直接把数组喂给Whisper，省掉faster-whisper内部对同一文件
+    再做一次解码+重采样
+
     参数:
         audio_path: 音频文件路径
-    
+
+    返回:
+        float32 numpy数组，失败返回None
+    """
+    try:
+        import numpy as np
+
+        cmd = ['ffmpeg', '-i', audio_path, '-f', 's16le', '-ac', '1',
+               '-ar', '16000', '-loglevel', 'error', 'pipe:1']
+        result = subprocess.run(cmd, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL)
+        if result.returncode != 0 or not result.stdout:
+            return None
+
+        return np.frombuffer(result.stdout,
+                             dtype=np.int16).astype(np.float32) / 32768.0
+    except Exception:
+        return None
+
+def transcribe_audio_with_whisper(audio_path, model_name="base"):
+    """
+    使用Faster Whisper进行语音识别（CTranslate2，int8量化，比原版快数倍）
+
+    参数:
+        audio_path: 音频文件路径
+        model_name: 模型名称（tiny/base/small/medium/large-v3）
+
     返回:
         识别的文本
     """
     try:
-        import whisper
-        
-        # 加载模型，可以选择 'tiny', 'base', 'small', 'medium', 'large'
-        # 模型越大精度越高但速度越慢
-        model = whisper.load_model("base")
-        
-        # 转录音频
-        result = model.transcribe(audio_path, language='zh')
-        
-        return result["text"]
-        
+        # 预先解码成PCM数组；失败时让Whisper自己读文件
+        audio = _read_pcm(audio_path)
+        if audio is None:
+            audio = audio_path
+
+        # 转录音频（优先批量管线）
+        pipeline = _get_pipeline(model_name)
+        if pipeline is not None:
+            segments, info = pipeline.transcribe(audio, language='zh',
+                                                 batch_size=16)
+        else:
+            segments, info = _get_model(model_name).transcribe(audio,
+                                                               language='zh')
+
+        return "".join(segment.text for segment in segments)
+
     except ImportError:
-        print("Whisper未安装，尝试使用其他方法...")
+        print("faster-whisper未安装，尝试使用其他方法...")
         return transcribe_audio_with_speech_recognition(audio_path)
     except Exception as e:
         print(f"Whisper识别失败: {e}")
         return ""
 
+@functools.lru_cache(maxsize=1)
+def _get_recognizer():
+    """初始化speech_recognition识别器（缓存复用）"""
+    import speech_recognition as sr
+    return sr.Recognizer()
+
 def transcribe_audio_with_speech_recognition(audio_path):
     """
     使用speech_recognition进行语音识别（需要网络连接）
@@ -87,10 +153,10 @@ def transcribe_audio_with_speech_recognition(audio_path):
     """
     try:
         import speech_recognition as sr
-        
-        # 初始化识别器
-        recognizer = sr.Recognizer()
-        
+
+        # 初始化识别器（进程内复用同一个实例）
+        recognizer = _get_recognizer()
+
         # 加载音频文件
         with sr.AudioFile(audio_path) as source:
             audio_data = recognizer.record(source)
@@ -111,31 +177,31 @@ def transcribe_audio_with_speech_recognition(audio_path):
 
 def save_text_as_markdown(text, output_path):
     """
-    将文本保存为Markdown文件
-    
+    将文本保存为Markdown文件（整段一次性写入，不走文本模式的增量编码）
+
     参数:
         text: 要保存的文本
         output_path: 输出文件路径
     """
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"# 语音识别结果\n\n")
-            f.write(f"## 转录文本\n\n")
-            f.write(text)
+        payload = f"# 语音识别结果\n\n## 转录文本\n\n{text}"
+        Path(output_path).write_bytes(payload.encode('utf-8'))
         return True
     except Exception as e:
         print(f"保存Markdown文件失败 {output_path}: {e}")
         return False
 
-def process_mp4_files(input_dir, output_dir=None, keep_audio=False, use_whisper=True):
+def process_mp4_files(input_dir, output_dir=None, keep_audio=False, use_whisper=True,
+                      model_name="base"):
     """
     处理目录中的所有MP4文件
-    
+
     参数:
         input_dir: 输入目录路径
         output_dir: 输出目录路径（可选）
         keep_audio: 是否保留提取的音频文件
         use_whisper: 是否使用Whisper进行识别
+        model_name: Whisper模型名称
     """
     # 转换为Path对象
     input_path = Path(input_dir)
@@ -161,30 +227,60 @@ def process_mp4_files(input_dir, output_dir=None, keep_audio=False, use_whisper=
     
     print(f"找到 {len(mp4_files)} 个MP4文件")
     
-    # 处理每个MP4文件
-    for mp4_file in tqdm(mp4_files, desc="处理文件中"):
-        print(f"\n处理文件: {mp4_file.name}")
-        
-        # 设置输出文件路径
+    # 收集待处理文件（跳过已处理的）
+    pending = []
+    for mp4_file in mp4_files:
         base_name = mp4_file.stem
-        audio_file = audio_dir / f"{base_name}.mp3"
+        audio_file = audio_dir / f"{base_name}.wav"
         md_file = output_path / f"{base_name}.md"
-        
-        # 跳过已处理的文件
+
         if md_file.exists():
             print(f"跳过已处理的文件: {base_name}")
             continue
-        
-        # 步骤1: 提取音频
-        print(f"  提取音频...")
-        if not extract_audio_from_mp4(str(mp4_file), str(audio_file)):
+
+        pending.append((mp4_file, audio_file, md_file))
+
+    # 流水线：提取worker把完成的音频直接推进有界队列，主线程边收边转写。
+    # ffmpeg延迟被Whisper计算遮住，总耗时≈max(提取总时长, 转写总时长)
+    # 而不是两者之和。put在worker线程里做：队列满时worker阻塞，提取
+    # 真正停下来等消费端，未消费的临时WAV最多 队列容量+线程数 个
+    result_queue = queue.Queue(maxsize=4)
+
+    def _extract_one(item):
+        try:
+            ok = extract_audio_from_mp4(str(item[0]), str(item[1]))
+        except Exception as e:
+            print(f"\n提取异常 {item[0].name}: {e}")
+            ok = False
+        result_queue.put((item, ok))
+
+    def _extract_producer():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            for item in pending:
+                executor.submit(_extract_one, item)
+        result_queue.put(None)  # 结束标记
+
+    threading.Thread(target=_extract_producer, daemon=True).start()
+
+    # 消费端: 串行转写（模型独占GPU/CPU）
+    pbar = tqdm(total=len(pending), desc="处理文件中")
+    while True:
+        got = result_queue.get()
+        if got is None:
+            break
+
+        (mp4_file, audio_file, md_file), extract_ok = got
+        pbar.update(1)
+        print(f"\n处理文件: {mp4_file.name}")
+
+        if not extract_ok:
             print(f"  音频提取失败，跳过此文件")
             continue
-        
+
         # 步骤2: 语音识别
         print(f"  语音识别中...")
         if use_whisper:
-            text = transcribe_audio_with_whisper(str(audio_file))
+            text = transcribe_audio_with_whisper(str(audio_file), model_name)
         else:
             text = transcribe_audio_with_speech_recognition(str(audio_file))
         
@@ -200,7 +296,9 @@ def process_mp4_files(input_dir, output_dir=None, keep_audio=False, use_whisper=
         # 步骤4: 清理临时音频文件
         if not keep_audio and audio_file.exists():
             audio_file.unlink()
-    
+
+    pbar.close()
+
     # 清理临时音频目录
     if not keep_audio and audio_dir.exists():
         try:
@@ -217,6 +315,9 @@ def main():
     parser.add_argument('-o', '--output', help='输出目录（默认为输入目录下的transcriptions文件夹）')
     parser.add_argument('-k', '--keep-audio', action='store_true', help='保留提取的音频文件')
     parser.add_argument('--no-whisper', action='store_true', help='不使用Whisper（使用在线识别）')
+    parser.add_argument('--model', default='base',
+                        help='Whisper模型（tiny/base/small/medium/large-v3，'
+                             '或预设 fast/quality）')
     
     args = parser.parse_args()
     
@@ -227,11 +328,13 @@ def main():
     
     # 处理文件
     use_whisper = not args.no_whisper
+    model_name = MODEL_PRESETS.get(args.model, args.model)
     process_mp4_files(
         input_dir=args.input_dir,
         output_dir=args.output,
         keep_audio=args.keep_audio,
-        use_whisper=use_whisper
+        use_whisper=use_whisper,
+        model_name=model_name
     )
 
 if __name__ == "__main__":
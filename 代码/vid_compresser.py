@@ -1,17 +1,69 @@
 import os
+import functools
 import subprocess
 from pathlib import Path
 
-def compress_mp4_files(input_folder, output_folder=None, crf=28, preset='medium', audio_bitrate='64k'):
+@functools.lru_cache(maxsize=1)
+def _detect_hw_encoder():
+    """探测可用的H.264硬件编码器（只探测一次，结果缓存）
+
+    -encoders里列出只说明编译进了ffmpeg，机器上未必有对应硬件/驱动
+    （发行版和静态构建在无GPU机器上也会列出h264_nvenc），所以对每个
+    候选再用一帧黑屏做测试编码确认真正能用。
+    返回第一个通过测试的编码器名；都不可用时返回None，回退libx264
+    """
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-encoders'],
+            capture_output=True, text=True, timeout=10
+        )
+    except Exception:
+        return None
+
+    for encoder in ('h264_nvenc', 'h264_qsv', 'h264_videotoolbox', 'h264_amf'):
+        if encoder not in result.stdout:
+            continue
+        # 一帧128x128黑屏编到null muxer，秒级完成；失败说明硬件/驱动缺失
+        try:
+            probe = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+                 '-f', 'lavfi', '-i', 'color=black:s=128x128:d=0.1',
+                 '-frames:v', '1', '-c:v', encoder, '-f', 'null', '-'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                timeout=15
+            )
+            if probe.returncode == 0:
+                return encoder
+        except Exception:
+            continue
+    return None
+
+def _video_encode_args(crf, preset):
+    """按可用编码器生成视频编码参数（专用编码芯片比CPU快5-10倍）"""
+    encoder = _detect_hw_encoder()
+    if encoder == 'h264_nvenc':
+        return ['-c:v', 'h264_nvenc', '-preset', 'p4', '-rc', 'vbr', '-cq', str(crf)]
+    if encoder == 'h264_qsv':
+        return ['-c:v', 'h264_qsv', '-global_quality', str(crf)]
+    if encoder == 'h264_videotoolbox':
+        return ['-c:v', 'h264_videotoolbox', '-q:v', '50']
+    if encoder == 'h264_amf':
+        return ['-c:v', 'h264_amf', '-rc', 'cqp', '-qp_i', str(crf), '-qp_p', str(crf)]
+
+    # 没有硬件编码器，回退CPU libx264
+    return ['-c:v', 'libx264', '-crf', str(crf), '-preset', preset]
+
+def compress_mp4_files(input_folder, output_folder=None, crf=28, preset='medium', audio_bitrate='64k', force=False):
     """
     压缩指定文件夹中的所有MP4文件
-    
+
     参数:
     input_folder: 输入文件夹路径
     output_folder: 输出文件夹路径（如果为None，则在原文件夹创建compressed子文件夹）
     crf: 压缩质量，值越大压缩率越高（推荐23-28，微信发送可用28）
     preset: 编码预设，可选 ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow
     audio_bitrate: 音频比特率
+    force: 是否强制重新压缩已存在的输出文件
     """
     
     # 如果未指定输出文件夹，则在原文件夹下创建compressed文件夹
@@ -21,36 +73,50 @@ def compress_mp4_files(input_folder, output_folder=None, crf=28, preset='medium'
     # 创建输出文件夹
     os.makedirs(output_folder, exist_ok=True)
     
-    # 支持的文件扩展名
-    video_extensions = {'.mp4', '.MP4', '.Mp4'}
-    
-    # 遍历文件夹中的所有文件
-    for file in os.listdir(input_folder):
-        file_path = os.path.join(input_folder, file)
-        
-        # 检查是否是文件且是mp4格式
-        if os.path.isfile(file_path) and os.path.splitext(file)[1] in video_extensions:
+    hw_encoder = _detect_hw_encoder()
+    if hw_encoder:
+        print(f"检测到硬件编码器: {hw_encoder}")
+
+    # 遍历文件夹中的所有文件（DirEntry缓存了类型信息，免去每个文件
+    # 一次额外的stat；统一lower()匹配，任何大小写的.mp4都能识别）
+    with os.scandir(input_folder) as entries:
+        for entry in entries:
+            if not (entry.is_file() and entry.name.lower().endswith('.mp4')):
+                continue
+
+            file = entry.name
+            file_path = entry.path
             output_path = os.path.join(output_folder, file)
-            
+
+            # 断点续跑：输出已存在、非空且比源文件新就跳过，
+            # 省掉每个文件几分钟的重复编码
+            if (not force and os.path.exists(output_path)
+                    and os.path.getsize(output_path) > 0
+                    and os.path.getmtime(output_path) >= os.path.getmtime(file_path)):
+                print(f"跳过已压缩: {file}")
+                continue
+
             print(f"正在压缩: {file}")
             
             # FFmpeg压缩命令
             cmd = [
                 'ffmpeg',
                 '-i', file_path,           # 输入文件
-                '-c:v', 'libx264',         # 视频编码器
-                '-crf', str(crf),          # 质量参数
-                '-preset', preset,         # 编码速度预设
+                *_video_encode_args(crf, preset),  # 视频编码器（优先硬件）
                 '-c:a', 'aac',            # 音频编码器
                 '-b:a', audio_bitrate,     # 音频比特率
                 '-movflags', '+faststart', # 优化网络播放
+                '-loglevel', 'error',      # 只输出错误
+                '-nostats',                # 不打进度统计
+                '-nostdin',                # 不读stdin
                 '-y',                      # 覆盖输出文件
                 output_path
             ]
-            
+
             try:
-                # 执行压缩命令
-                subprocess.run(cmd, check=True, capture_output=True)
+                # 执行压缩命令（stdout丢弃；stderr只剩错误信息，体积有界）
+                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE)
                 print(f"✓ 完成: {file}")
                 
                 # 显示压缩前后大小对比
@@ -69,7 +135,7 @@ def compress_mp4_files(input_folder, output_folder=None, crf=28, preset='medium'
                 print(f"✗ 处理出错: {file}")
                 print(f"  错误: {str(e)}")
 
-def compress_for_wechat(input_folder, output_folder=None):
+def compress_for_wechat(input_folder, output_folder=None, force=False):
     """
     专门为微信发送优化的压缩函数
     """
@@ -79,16 +145,20 @@ def compress_for_wechat(input_folder, output_folder=None):
         output_folder=output_folder,
         crf=28,              # 较高压缩率
         preset='fast',      # 较快编码速度
-        audio_bitrate='48k' # 较低音频质量
+        audio_bitrate='48k', # 较低音频质量
+        force=force
     )
 
 if __name__ == "__main__":
-    # 使用示例
+    import sys
+
+    # 使用示例（命令行带--force时强制重新压缩已有输出）
+    force = '--force' in sys.argv
     folder_path = input("请输入包含MP4文件的文件夹路径: ").strip()
     
     if os.path.isdir(folder_path):
         print(f"开始处理文件夹: {folder_path}")
-        compress_for_wechat(folder_path)
+        compress_for_wechat(folder_path, force=force)
         print("\n压缩完成！文件保存在 'compressed' 子文件夹中")
     else:
         print("错误: 指定的文件夹不存在！")
\ No newline at end of file
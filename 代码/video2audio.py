@@ -6,8 +6,10 @@
 """
 
 import os
+import re
 import sys
 import argparse
+import json
 import subprocess
 import concurrent.futures
 from pathlib import Path
@@ -16,15 +18,23 @@ from datetime import datetime
 from tqdm import tqdm
 import shutil
 
+# ffmpeg分析输出的解析正则（预编译，整段stderr各扫一次，
+# 只在ffprobe不可用的回退路径上使用）
+_DURATION_RE = re.compile(r'Duration:\s*(\d+:\d+:\d+\.\d+)')
+_AUDIO_RE = re.compile(r'Stream[^\n]*Audio:(?:[^\n]*?(\d+) Hz)?')
+
 class VideoToAudioConverter:
     """视频转音频转换器"""
     
-    # 支持的视频格式
-    SUPPORTED_VIDEO_FORMATS = {
-        '.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', 
+    # 支持的视频格式（frozenset：不可变且全小写，查找时只lower一次）
+    SUPPORTED_VIDEO_FORMATS = frozenset({
+        '.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm',
         '.m4v', '.mpg', '.mpeg', '.3gp', '.mts', '.m2ts', '.ts',
         '.rm', '.rmvb', '.asf', '.vob', '.ogv', '.divx'
-    }
+    })
+
+    # str.endswith接收tuple是C实现，大目录遍历时按文件名一次匹配全部后缀
+    _SUFFIX_TUPLE = tuple(sorted(SUPPORTED_VIDEO_FORMATS))
     
     # 音频编码格式和参数
     AUDIO_FORMATS = {
@@ -74,10 +84,23 @@ class VideoToAudioConverter:
             ffmpeg_path: ffmpeg可执行文件路径，如果为None则从系统PATH查找
         """
         self.ffmpeg_path = ffmpeg_path or 'ffmpeg'
+        # ffprobe与ffmpeg同目录发布，只替换可执行文件名
+        # （不能对整个路径replace：目录名里的"ffmpeg"也会被改掉）
+        ffmpeg_dir, ffmpeg_name = os.path.split(self.ffmpeg_path)
+        self.ffprobe_path = os.path.join(
+            ffmpeg_dir, ffmpeg_name.replace('ffmpeg', 'ffprobe'))
         self._check_ffmpeg()
     
+    # 已探测过的ffmpeg路径缓存（路径 -> 是否可用）；
+    # __init__和main都会检查，每个worker实例化也会检查，只探测一次即可
+    _FFMPEG_CHECKED = {}
+
     def _check_ffmpeg(self) -> bool:
-        """检查ffmpeg是否可用"""
+        """检查ffmpeg是否可用（同一路径只起一次子进程，结果缓存在类上）"""
+        cached = self._FFMPEG_CHECKED.get(self.ffmpeg_path)
+        if cached is not None:
+            return cached
+
         try:
             result = subprocess.run(
                 [self.ffmpeg_path, '-version'],
@@ -89,29 +112,32 @@ class VideoToAudioConverter:
                 # 获取ffmpeg版本
                 version_line = result.stdout.split('\n')[0]
                 print(f"✓ 找到ffmpeg: {version_line}")
-                return True
+                ok = True
             else:
                 print(f"✗ ffmpeg检查失败: {result.stderr}")
-                return False
+                ok = False
         except FileNotFoundError:
             print(f"✗ 找不到ffmpeg: {self.ffmpeg_path}")
             print("请安装ffmpeg:")
             print("  Ubuntu/Debian: sudo apt install ffmpeg")
             print("  macOS: brew install ffmpeg")
             print("  Windows: 从 https://ffmpeg.org/download.html 下载")
-            return False
+            ok = False
+
+        self._FFMPEG_CHECKED[self.ffmpeg_path] = ok
+        return ok
     
     def get_video_info(self, video_path: str) -> Dict:
-        """获取视频文件信息"""
+        """获取视频文件信息（ffprobe结构化JSON，毫秒级返回且不解码任何帧）"""
         cmd = [
-            self.ffmpeg_path,
-            '-i', video_path,
-            '-hide_banner',
-            '-loglevel', 'error',
-            '-f', 'null',
-            '-'
+            self.ffprobe_path,
+            '-v', 'error',
+            '-show_streams',
+            '-show_format',
+            '-of', 'json',
+            video_path
         ]
-        
+
         try:
             result = subprocess.run(
                 cmd,
@@ -119,44 +145,130 @@ class VideoToAudioConverter:
                 text=True,
                 timeout=10
             )
-            
-            info = {'path': video_path, 'size': os.path.getsize(video_path)}
-            
-            # 从错误输出中解析信息（ffmpeg在分析文件时输出到stderr）
-            lines = result.stderr.split('\n')
-            for line in lines:
-                if 'Duration:' in line:
-                    # 解析时长
-                    parts = line.split(',')
-                    for part in parts:
-                        if 'Duration:' in part:
-                            duration = part.split('Duration:')[1].strip()
-                            info['duration'] = duration.split()[0]
-                
-                elif 'Stream' in line and 'Audio:' in line:
-                    # 解析音频信息
-                    if 'Audio:' in line:
-                        info['has_audio'] = True
-                        if 'Hz' in line:
-                            try:
-                                hz_part = line.split('Hz')[0]
-                                hz = hz_part.split()[-1]
-                                info['sample_rate'] = hz
-                            except:
-                                pass
-            
-            if 'has_audio' not in info:
-                info['has_audio'] = False
-            
+
+            info = {
+                'path': video_path,
+                'size': os.path.getsize(video_path),
+                'has_audio': False
+            }
+
+            if result.returncode != 0:
+                return info
+
+            data = json.loads(result.stdout)
+
+            duration = data.get('format', {}).get('duration')
+            if duration:
+                info['duration'] = duration
+
+            # 取第一条音频流
+            for stream in data.get('streams', []):
+                if stream.get('codec_type') == 'audio':
+                    info['has_audio'] = True
+                    if stream.get('codec_name'):
+                        info['audio_codec'] = stream['codec_name']
+                    if stream.get('sample_rate'):
+                        info['sample_rate'] = stream['sample_rate']
+                    break
+
             return info
-            
+
         except subprocess.TimeoutExpired:
             print(f"获取视频信息超时: {video_path}")
             return {'path': video_path, 'has_audio': False}
+        except FileNotFoundError:
+            # 环境里没装ffprobe，回退到ffmpeg stderr解析
+            return self._get_video_info_ffmpeg(video_path)
+        except Exception as e:
+            print(f"获取视频信息失败 {video_path}: {e}")
+            return {'path': video_path, 'has_audio': False}
+
+    def _get_video_info_ffmpeg(self, video_path: str) -> Dict:
+        """回退路径：解析ffmpeg分析输出
+
+        预编译正则对整段stderr各扫一次，代替原来逐行in/split的Python循环
+        """
+        # 不带输出文件的ffmpeg -i只打印流信息就退出，不解码任何帧
+        cmd = [self.ffmpeg_path, '-hide_banner', '-i', video_path]
+
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+
+            info = {
+                'path': video_path,
+                'size': os.path.getsize(video_path),
+                'has_audio': False
+            }
+
+            match = _DURATION_RE.search(result.stderr)
+            if match:
+                info['duration'] = match.group(1)
+
+            match = _AUDIO_RE.search(result.stderr)
+            if match:
+                info['has_audio'] = True
+                if match.group(1):
+                    info['sample_rate'] = match.group(1)
+
+            return info
+
         except Exception as e:
             print(f"获取视频信息失败 {video_path}: {e}")
             return {'path': video_path, 'has_audio': False}
     
+    def _build_audio_args(
+        self,
+        audio_format: str,
+        quality: int = None,
+        bitrate: str = None,
+        sample_rate: int = None,
+        channels: int = None
+    ) -> List[str]:
+        """构建一路音频输出的ffmpeg参数（单文件和批量组共用）"""
+        format_config = self.AUDIO_FORMATS[audio_format]
+
+        args = ['-vn', '-sn', '-dn']  # 不要视频/字幕/数据流
+
+        # 音频编解码器
+        args.extend(['-acodec', format_config['codec']])
+
+        # 质量参数
+        if format_config['args']:
+            args.extend(format_config['args'])
+
+        # 自定义质量参数
+        if quality is not None:
+            if audio_format == 'mp3':
+                args.extend(['-q:a', str(quality)])  # 0-9, 0最好
+            elif audio_format == 'ogg':
+                args.extend(['-q:a', str(quality)])  # -1-10, 10最好
+
+        # 比特率
+        if bitrate:
+            args.extend(['-b:a', bitrate])
+        elif format_config.get('bitrate'):
+            args.extend(['-b:a', format_config['bitrate']])
+
+        # 采样率
+        if sample_rate:
+            args.extend(['-ar', str(sample_rate)])
+
+        # 声道数
+        if channels:
+            args.extend(['-ac', str(channels)])
+
+        args.extend(['-threads', '1'])  # 单线程编码，由批量层并发N个ffmpeg占满N核
+        return args
+
+    # 目标格式 -> 源流已是该编码时可直接复制的codec_name
+    # （MP4/MOV里几乎都是AAC，复制只做封装，比解码+重编码快一两个数量级且无损）
+    _COPY_CODECS = {'aac': 'aac', 'opus': 'opus', 'flac': 'flac'}
+
     def convert_video_to_audio(
         self,
         video_path: str,
@@ -200,55 +312,36 @@ class VideoToAudioConverter:
         if audio_format not in self.AUDIO_FORMATS:
             return False, f"不支持的音频格式: {audio_format}"
         
-        format_config = self.AUDIO_FORMATS[audio_format]
-        
         # 构建ffmpeg命令
         cmd = [self.ffmpeg_path, '-i', video_path]
-        
-        # 添加音频参数
-        cmd.extend(['-vn'])  # 不要视频
-        cmd.extend(['-sn'])  # 不要字幕
-        cmd.extend(['-dn'])  # 不要数据
-        
-        # 音频编解码器
-        cmd.extend(['-acodec', format_config['codec']])
-        
-        # 质量参数
-        if format_config['args']:
-            cmd.extend(format_config['args'])
-        
-        # 自定义质量参数
-        if quality is not None:
-            if audio_format == 'mp3':
-                cmd.extend(['-q:a', str(quality)])  # 0-9, 0最好
-            elif audio_format == 'ogg':
-                cmd.extend(['-q:a', str(quality)])  # -1-10, 10最好
-        
-        # 比特率
-        if bitrate:
-            cmd.extend(['-b:a', bitrate])
-        elif format_config.get('bitrate'):
-            cmd.extend(['-b:a', format_config['bitrate']])
-        
-        # 采样率
-        if sample_rate:
-            cmd.extend(['-ar', str(sample_rate)])
-        
-        # 声道数
-        if channels:
-            cmd.extend(['-ac', str(channels)])
-        
+
+        # 源流编码已经是目标编码且不需要改质量/采样率/声道时，
+        # 直接流复制：不解码不编码，只重新封装
+        copy_codec = self._COPY_CODECS.get(audio_format)
+        can_copy = (copy_codec is not None and quality is None
+                    and bitrate is None and sample_rate is None
+                    and channels is None)
+        if can_copy and self.get_video_info(video_path).get('audio_codec') == copy_codec:
+            cmd.extend(['-vn', '-sn', '-dn', '-c:a', 'copy'])
+            if audio_format == 'aac':
+                cmd.extend(['-movflags', '+faststart'])  # m4a封装，优化流式播放
+        else:
+            # 添加音频参数
+            cmd.extend(self._build_audio_args(
+                audio_format, quality, bitrate, sample_rate, channels))
+
         # 其他参数
         cmd.extend(['-y' if overwrite else '-n'])  # 是否覆盖
-        cmd.extend(['-loglevel', 'error'])  # 只显示错误
+        cmd.extend(['-loglevel', 'error', '-nostats', '-nostdin'])  # 只显示错误
         cmd.append(audio_path)
-        
+
         try:
-            # 执行转换
+            # 执行转换（不在Python里缓冲ffmpeg输出，
+            # 长转码的stderr可能无限增长；只留错误信息）
             result = subprocess.run(
                 cmd,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 timeout=3600,  # 1小时超时
                 creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
             )
@@ -260,7 +353,8 @@ class VideoToAudioConverter:
                 else:
                     return False, "转换后文件为空或不存在"
             else:
-                error_msg = result.stderr.strip() or "未知错误"
+                error_msg = result.stderr.decode(
+                    'utf-8', errors='replace').strip() or "未知错误"
                 return False, f"ffmpeg错误: {error_msg}"
                 
         except subprocess.TimeoutExpired:
@@ -268,6 +362,66 @@ class VideoToAudioConverter:
         except Exception as e:
             return False, f"转换异常: {str(e)}"
     
+    # 每个ffmpeg进程处理的文件数（摊薄进程启动开销，Windows上每次启动1-2秒）
+    GROUP_SIZE = 8
+
+    def convert_group(self, tasks: List[Dict]) -> List[Tuple[bool, str]]:
+        """
+        一个ffmpeg进程转换一组同参数文件（多个-i输入，逐路-map输出）
+
+        batch_convert的一次调用里所有任务的格式/质量参数相同，
+        可以合并进单次ffmpeg调用，免去N次进程启动。
+        组内任一文件出错时退回逐个转换，保证错误能归属到具体文件。
+
+        参数:
+            tasks: convert_video_to_audio的参数字典列表
+
+        返回:
+            与tasks一一对应的(是否成功, 信息)列表
+        """
+        if len(tasks) == 1:
+            return [self.convert_video_to_audio(**tasks[0])]
+
+        overwrite = tasks[0]['overwrite']
+        cmd = [self.ffmpeg_path, '-y' if overwrite else '-n',
+               '-loglevel', 'error', '-nostats', '-nostdin']
+
+        for task in tasks:
+            cmd.extend(['-i', task['video_path']])
+
+        for index, task in enumerate(tasks):
+            cmd.extend(['-map', f'{index}:a:0'])
+            cmd.extend(self._build_audio_args(
+                task['audio_format'], task['quality'], task['bitrate'],
+                task['sample_rate'], task['channels']))
+            cmd.append(task['audio_path'])
+
+        try:
+            result = subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,  # 失败时逐个重试会拿到具体错误
+                timeout=3600,
+                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+            )
+        except subprocess.TimeoutExpired:
+            return [(False, "转换超时 (超过1小时)")] * len(tasks)
+        except Exception as e:
+            return [(False, f"转换异常: {str(e)}")] * len(tasks)
+
+        if result.returncode != 0:
+            # 整组失败，逐个重试定位坏文件
+            return [self.convert_video_to_audio(**task) for task in tasks]
+
+        results = []
+        for task in tasks:
+            audio_path = task['audio_path']
+            if os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
+                results.append((True, "转换成功"))
+            else:
+                results.append((False, "转换后文件为空或不存在"))
+        return results
+
     def batch_convert(
         self,
         input_dir: str,
@@ -280,7 +434,8 @@ class VideoToAudioConverter:
         recursive: bool = False,
         keep_structure: bool = False,
         overwrite: bool = True,
-        max_workers: int = 2
+        max_workers: int = None,
+        probe_first: bool = False
     ) -> Dict:
         """
         批量转换目录中的所有视频文件
@@ -296,8 +451,11 @@ class VideoToAudioConverter:
             recursive: 是否递归处理子目录
             keep_structure: 是否保持目录结构
             overwrite: 是否覆盖已存在的文件
-            max_workers: 最大并行任务数
-            
+            max_workers: 最大并行任务数（None则取CPU核心数；
+                         等待ffmpeg子进程不占GIL，线程即可跑满多核）
+            probe_first: 转换前先用ffprobe确认有音频流，
+                         无音频文件直接计入统计不起转换进程
+
         返回:
             转换统计信息
         """
@@ -316,20 +474,13 @@ class VideoToAudioConverter:
         # 创建输出目录
         output_path.mkdir(parents=True, exist_ok=True)
         
-        # 查找视频文件
-        video_files = []
-        if recursive:
-            # 递归查找
-            for root, dirs, files in os.walk(input_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    if file_path.suffix.lower() in self.SUPPORTED_VIDEO_FORMATS:
-                        video_files.append(file_path)
-        else:
-            # 只查找当前目录
-            for file in input_path.iterdir():
-                if file.is_file() and file.suffix.lower() in self.SUPPORTED_VIDEO_FORMATS:
-                    video_files.append(file)
+        # 查找视频文件（递归用rglob，一次遍历加统一的后缀过滤，
+        # 不再走os.walk逐文件拼Path对象）
+        candidates = input_path.rglob('*') if recursive else input_path.iterdir()
+        video_files = [
+            file for file in candidates
+            if file.name.lower().endswith(self._SUFFIX_TUPLE) and file.is_file()
+        ]
         
         if not video_files:
             return {
@@ -376,6 +527,15 @@ class VideoToAudioConverter:
                 pbar.update(1)
                 pbar.set_postfix({'状态': f"跳过 {video_file.name}"})
                 continue
+
+            # 可选：先探测有没有音频流，没有就不用付转换进程的启动开销
+            if probe_first:
+                info = self.get_video_info(str(video_file))
+                if not info.get('has_audio'):
+                    stats['no_audio'] += 1
+                    pbar.update(1)
+                    pbar.set_postfix({'状态': f"无音频 {video_file.name}"})
+                    continue
             
             # 创建转换任务
             task = {
@@ -390,26 +550,39 @@ class VideoToAudioConverter:
             }
             tasks.append(task)
         
-        # 并行处理
+        # 并行处理（默认并发数=核心数，配合每个ffmpeg的-threads 1）
+        if max_workers is None:
+            max_workers = min(len(tasks), os.cpu_count() or 2) if tasks else 1
+
         if max_workers > 1 and len(tasks) > 1:
             print(f"使用 {max_workers} 个线程并行处理...")
+
+            # 一次batch_convert调用内所有任务参数相同，按组合并，
+            # 一个ffmpeg进程转一组，摊薄进程启动开销
+            groups = [tasks[i:i + self.GROUP_SIZE]
+                      for i in range(0, len(tasks), self.GROUP_SIZE)]
+
             with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
                 # 提交任务
-                future_to_task = {
-                    executor.submit(
-                        self.convert_video_to_audio,
-                        **task
-                    ): task for task in tasks
+                future_to_group = {
+                    executor.submit(self.convert_group, group): group
+                    for group in groups
                 }
-                
+
                 # 处理结果
-                for future in concurrent.futures.as_completed(future_to_task):
-                    task = future_to_task[future]
-                    video_name = os.path.basename(task['video_path'])
-                    
+                for future in concurrent.futures.as_completed(future_to_group):
+                    group = future_to_group[future]
+
                     try:
-                        success, message = future.result(timeout=3600)
-                        
+                        results = future.result(timeout=3600)
+                    except concurrent.futures.TimeoutError:
+                        results = [(False, "转换超时")] * len(group)
+                    except Exception as e:
+                        results = [(False, f"转换异常: {e}")] * len(group)
+
+                    for task, (success, message) in zip(group, results):
+                        video_name = os.path.basename(task['video_path'])
+
                         if success:
                             stats['success'] += 1
                             pbar.set_postfix({'状态': f"✓ {video_name}"})
@@ -417,17 +590,8 @@ class VideoToAudioConverter:
                             stats['failed'] += 1
                             pbar.set_postfix({'状态': f"✗ {video_name}"})
                             print(f"\n转换失败 {video_name}: {message}")
-                            
-                    except concurrent.futures.TimeoutError:
-                        stats['failed'] += 1
-                        pbar.set_postfix({'状态': f"⏰ {video_name}"})
-                        print(f"\n转换超时: {video_name}")
-                    except Exception as e:
-                        stats['failed'] += 1
-                        pbar.set_postfix({'状态': f"💥 {video_name}"})
-                        print(f"\n转换异常 {video_name}: {e}")
-                    
-                    pbar.update(1)
+
+                        pbar.update(1)
         else:
             # 单线程处理
             for task in tasks:
@@ -521,8 +685,10 @@ def main():
                        help="保持目录结构")
     parser.add_argument("--no-overwrite", action="store_true",
                        help="不覆盖已存在的文件")
-    parser.add_argument("-t", "--threads", type=int, default=2,
-                       help="并行线程数 (默认: 2)")
+    parser.add_argument("--probe-first", action="store_true",
+                       help="转换前先探测音频流，跳过无音频文件")
+    parser.add_argument("-t", "--threads", type=int, default=None,
+                       help="并行线程数 (默认: CPU核心数)")
     parser.add_argument("--ffmpeg-path", help="ffmpeg可执行文件路径")
     
     # 信息选项
@@ -585,7 +751,7 @@ def main():
     print(f"递归处理: {'是' if args.recursive else '否'}")
     print(f"保持目录结构: {'是' if args.keep_structure else '否'}")
     print(f"覆盖已存在: {'否' if args.no_overwrite else '是'}")
-    print(f"并行线程: {args.threads}")
+    print(f"并行线程: {args.threads if args.threads else '自动（CPU核心数）'}")
     print(f"{'='*60}\n")
     
     # 执行转换
@@ -601,7 +767,8 @@ def main():
             recursive=args.recursive,
             keep_structure=args.keep_structure,
             overwrite=not args.no_overwrite,
-            max_workers=args.threads
+            max_workers=args.threads,
+            probe_first=args.probe_first
         )
         
         # 显示结果